@@ -1,27 +1,86 @@
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, HttpUrl
 from typing import List, Optional, Dict, Any
 import os
+import aiohttp
 import httpx
 import asyncio
+import hashlib
 import logging
-from bs4 import BeautifulSoup
+from collections import OrderedDict, deque
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree, html as lxml_html
 from pyppeteer import launch
 import json
+import orjson
 import re
+import threading
 from datetime import datetime
-from markdownify import markdownify as md
+from urllib.parse import urljoin, urlparse
 from readability import Document
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Documentation Extractor Service", description="Service for extracting documentation from websites")
+app = FastAPI(
+    title="Documentation Extractor Service",
+    description="Service for extracting documentation from websites",
+    default_response_class=ORJSONResponse
+)
 
 # Configuration
 KG_SERVICE_URL = os.getenv("KG_SERVICE_URL", "http://localhost:8000")
 SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8001"))
+KG_ENTITY_BATCH_SIZE = int(os.getenv("KG_ENTITY_BATCH_SIZE", "200"))
+KG_RELATION_BATCH_SIZE = int(os.getenv("KG_RELATION_BATCH_SIZE", "500"))
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "4"))
+BROWSER_POOL_RECYCLE_AFTER = int(os.getenv("BROWSER_POOL_RECYCLE_AFTER", "100"))
+BROWSER_ARGS = ['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
+URL_CACHE_MAX_ENTRIES = int(os.getenv("URL_CACHE_MAX_ENTRIES", "10000"))
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))
+
+# Knowledge Graph payloads are serialized with orjson and posted as raw bytes
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Tree builder used for every BeautifulSoup parse; bs4 raises FeatureNotFound
+# instead of silently falling back to html.parser when lxml is unavailable
+HTML_PARSER = "lxml"
+
+# Page HTML is re-encoded as UTF-8 before parsing, as readability does, so
+# pages that declare their own encoding parse the same way. Parsing runs in
+# worker threads and an lxml parser serializes concurrent use, so each thread
+# gets its own.
+thread_parsers = threading.local()
+
+# Custom selectors that are a bare tag name (e.g. "pre", "h2") can be served
+# from a soup that only materializes those tags
+SIMPLE_TAG_SELECTOR = re.compile(r'^[a-zA-Z][a-zA-Z0-9]*$')
+
+# Content categories inferred from a page URL, combined as a bitmask
+CONTENT_API = 1
+CONTENT_GUIDE = 2
+CONTENT_BEST_PRACTICES = 4
+URL_CATEGORY_FLAGS = {"api": CONTENT_API, "guide": CONTENT_GUIDE, "bp": CONTENT_BEST_PRACTICES}
+URL_CLASSIFIER = re.compile(
+    r'(?P<api>api|reference)|(?P<guide>guide|tutorial|docs)|(?P<bp>best[-\s]practices)',
+    re.IGNORECASE
+)
+BEST_PRACTICES_TEXT = re.compile(r'best practices', re.IGNORECASE)
+BEST_PRACTICE_HEADING = re.compile(r'best practice|recommendation', re.IGNORECASE)
+
+# Patterns checked per element during the single extraction walk
+HTTP_METHOD = re.compile(r'GET|POST|PUT|DELETE|PATCH')
+ENDPOINT_PATH = re.compile(r'^/\w+(/\w+)*(\{.*\})?$')
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4')
+GUIDE_HEADING_TAGS = ('h1', 'h2', 'h3')
+PATH_TAGS = ('h2', 'h3', 'dt')
+
+# Precompiled XPath queries for crawl links and the document base URL
+LINK_HREF_XPATH = etree.XPath("//a/@href")
+BASE_HREF_XPATH = etree.XPath("//base/@href")
 
 # Models
 class ExtractionRequest(BaseModel):
@@ -53,18 +112,123 @@ class ExtractionStatus(BaseModel):
 # In-memory storage for extraction jobs
 extraction_jobs = {}
 
-# HTTP client
+class BrowserPool:
+    """A shared headless browser with a fixed set of pre-opened pages.
+    
+    After `recycle_after` page checkouts the pool stops handing out pages and,
+    once every page is back, relaunches the browser to bound Chromium's memory
+    growth. It also relaunches whenever opening a page fails because the
+    browser crashed. Pages left over from a previous browser are replaced as
+    they pass through the pool, so its size never shrinks.
+    """
+    
+    def __init__(self, size: int, recycle_after: int):
+        self.size = size
+        self.recycle_after = recycle_after
+        self.browser = None
+        self.pages = asyncio.Queue()
+        self.held_pages = []
+        self.uses = 0
+    
+    async def start(self):
+        self.browser = await launch(headless=True, args=BROWSER_ARGS)
+        for _ in range(self.size):
+            self.pages.put_nowait(await self.browser.newPage())
+        self.uses = 0
+    
+    async def close(self):
+        if self.browser:
+            await self.browser.close()
+            self.browser = None
+    
+    async def relaunch(self):
+        # Swap in the new browser before closing the old one, so no page of
+        # the closing browser still counts as live
+        old_browser = self.browser
+        self.browser = await launch(headless=True, args=BROWSER_ARGS)
+        self.uses = 0
+        if old_browser:
+            try:
+                await old_browser.close()
+            except Exception as e:
+                logger.warning(f"Error closing headless browser: {str(e)}")
+    
+    def is_live(self, page):
+        return not page.isClosed() and page.browser is self.browser
+    
+    async def new_page(self):
+        try:
+            return await self.browser.newPage()
+        except Exception as e:
+            # The browser itself is gone; relaunch it and try once more
+            logger.warning(f"Relaunching headless browser: {str(e)}")
+            await self.relaunch()
+            return await self.browser.newPage()
+    
+    async def refresh(self, page):
+        """Return a live page for this slot, putting the old one back if none can be opened."""
+        if self.is_live(page):
+            return page
+        try:
+            return await self.new_page()
+        except Exception:
+            # Keep the slot so acquire() never waits on an empty pool
+            self.pages.put_nowait(page)
+            raise
+    
+    async def acquire(self):
+        return await self.refresh(await self.pages.get())
+    
+    async def release(self, page):
+        # Replace pages that crashed or were closed while in use
+        page = await self.refresh(page)
+        self.uses += 1
+        if self.uses < self.recycle_after:
+            self.pages.put_nowait(page)
+            return
+        
+        # Recycle due: hold pages back from acquire() until all of them are returned
+        self.held_pages.append(page)
+        while not self.pages.empty():
+            self.held_pages.append(self.pages.get_nowait())
+        if len(self.held_pages) < self.size:
+            return
+        
+        try:
+            await self.relaunch()
+        except Exception as e:
+            logger.error(f"Error recycling headless browser: {str(e)}")
+            self.uses = 0
+        finally:
+            # Pages of the old browser are replaced on their next checkout
+            for held_page in self.held_pages:
+                self.pages.put_nowait(held_page)
+            self.held_pages.clear()
+
+# HTTP clients and browser pool
 @app.on_event("startup")
 async def startup_event():
     app.state.http_client = httpx.AsyncClient()
+    
+    # Knowledge Graph pushes go through aiohttp, which holds up better under concurrent workers
+    app.state.kg_session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=60)
+    )
+    app.state.browser_pool = BrowserPool(BROWSER_POOL_SIZE, BROWSER_POOL_RECYCLE_AFTER)
+    await app.state.browser_pool.start()
+    
+    # Per-page extraction results kept across jobs (LRU), keyed by URL and extraction settings
+    app.state.url_cache = OrderedDict()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     await app.state.http_client.aclose()
+    await app.state.kg_session.close()
+    await app.state.browser_pool.close()
 
 # Knowledge Graph API client
 async def get_kg_client():
-    return app.state.http_client
+    return app.state.kg_session
 
 @app.get("/")
 async def root():
@@ -74,17 +238,33 @@ async def root():
 async def extract_documentation(
     request: ExtractionRequest, 
     background_tasks: BackgroundTasks,
-    kg_client: httpx.AsyncClient = Depends(get_kg_client)
+    kg_client: aiohttp.ClientSession = Depends(get_kg_client)
 ):
-    extraction_id = f"extraction_{datetime.now().strftime('%Y%m%d%H%M%S')}_{hash(request.url)}"
+    # The digest covers the whole request, so only identical submissions share an id;
+    # blake2b keeps it stable across restarts, unlike the randomized built-in hash()
+    request_digest = hashlib.blake2b(request.model_dump_json().encode(), digest_size=8).hexdigest()
+    extraction_id = f"extraction_{datetime.now().strftime('%Y%m%d%H%M%S')}_{request_digest}"
+    
+    # Repeated submissions of the same request within a second return the existing job
+    existing_job = extraction_jobs.get(extraction_id)
+    if existing_job is not None:
+        return ExtractionResponse(
+            url=request.url,
+            status=existing_job["status"],
+            company=existing_job["request"]["company"],
+            product=existing_job["request"]["product"],
+            extracted_entities=[],
+            extraction_id=extraction_id
+        )
     
-    # Initialize extraction job
+    # Initialize extraction job; seen_urls holds every URL ever queued for O(1) dedup
     extraction_jobs[extraction_id] = {
         "status": "initialized",
         "progress": 0,
         "completed_urls": [],
-        "pending_urls": [str(request.url)],
+        "pending_urls": deque([str(request.url)]),
         "error_urls": [],
+        "seen_urls": {str(request.url)},
         "request": request.dict(),
         "extracted_entities": []
     }
@@ -117,7 +297,7 @@ async def get_extraction_status(extraction_id: str):
         status=job["status"],
         progress=job["progress"],
         completed_urls=job["completed_urls"],
-        pending_urls=job["pending_urls"],
+        pending_urls=list(job["pending_urls"]),
         error_urls=job["error_urls"]
     )
 
@@ -143,71 +323,207 @@ async def get_extraction_results(extraction_id: str):
         "extracted_entities": job["extracted_entities"]
     }
 
-async def run_extraction(extraction_id: str, kg_client: httpx.AsyncClient):
-    """Run the extraction process in the background."""
+async def run_extraction(extraction_id: str, kg_client: aiohttp.ClientSession):
+    """Run the extraction process in the background.
+    
+    Pages flow through a pipeline: fetch workers render them with the shared
+    browser pool, parse workers extract entities and links, and a single push
+    task batches entities to the Knowledge Graph. Bounded queues between the
+    stages apply backpressure, so fetching, parsing and pushing overlap.
+    """
     job = extraction_jobs[extraction_id]
     request_data = job["request"]
     job["status"] = "running"
+    browser_pool = app.state.browser_pool
+    url_cache = app.state.url_cache
+    
+    parse_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    push_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    
+    # Idle fetch workers wait here until a URL is queued or no URL is left in
+    # flight anywhere in the pipeline
+    url_available = asyncio.Condition()
+    in_flight = 0
+    
+    # Pages with identical content are only extracted once per job
+    seen_hashes = set()
+    extraction_settings = json.dumps(
+        [request_data[key] for key in ("company", "company_type", "product", "product_type", "selectors")],
+        sort_keys=True
+    )
     
-    try:
-        # Launch browser
-        browser = await launch(
-            headless=True,
-            args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
-        )
-        page = await browser.newPage()
-        
-        # Process URLs
-        while job["pending_urls"]:
-            current_url = job["pending_urls"].pop(0)
-            
-            try:
-                # Navigate to page
-                await page.goto(current_url, {'waitUntil': 'networkidle0', 'timeout': 60000})
-                
-                # Get page content
-                content = await page.content()
-                
-                # Extract data
-                entities = await extract_entities_from_content(
-                    content=content,
-                    url=current_url,
-                    company=request_data["company"],
-                    company_type=request_data["company_type"],
-                    product=request_data["product"],
-                    product_type=request_data["product_type"],
-                    selectors=request_data.get("selectors")
-                )
-                
+    async def finish_url(current_url, entities=None, links=None, cache_entry=None, error=None):
+        """Record the outcome for a URL and release its in-flight slot."""
+        nonlocal in_flight
+        try:
+            if error is None:
                 # Store extracted entities
                 job["extracted_entities"].extend(entities)
                 
-                # Push to Knowledge Graph
-                if entities:
-                    await push_to_knowledge_graph(entities, kg_client)
+                # Hand new entities to the Knowledge Graph push task, which
+                # caches the page once they have been pushed
+                if cache_entry is not None:
+                    await push_queue.put(cache_entry)
                 
-                # If recursive, extract links and add to pending
-                if request_data["recursive"] and len(job["completed_urls"]) < request_data["max_depth"]:
-                    links = await extract_internal_links(page, current_url)
-                    for link in links:
-                        if (link not in job["completed_urls"] and 
-                            link not in job["pending_urls"] and 
-                            link not in [e["url"] for e in job["error_urls"]]):
-                            job["pending_urls"].append(link)
+                # If recursive, add extracted links to pending
+                for link in links or []:
+                    if link not in job["seen_urls"]:
+                        job["pending_urls"].append(link)
+                        job["seen_urls"].add(link)
                 
                 # Mark as completed
                 job["completed_urls"].append(current_url)
+            else:
+                logger.error(f"Error processing URL {current_url}: {str(error)}")
+                job["error_urls"].append({"url": current_url, "error": str(error)})
+        finally:
+            async with url_available:
+                in_flight -= 1
+                
+                # Update progress
+                total_urls = len(job["completed_urls"]) + len(job["pending_urls"]) + len(job["error_urls"])
+                job["progress"] = len(job["completed_urls"]) / total_urls if total_urls > 0 else 1.0
                 
+                url_available.notify_all()
+    
+    async def extract_page(current_url, cache_key, want_links, content, headers, page_url):
+        """Extract entities and links from rendered HTML; returns (entities, links, cache_entry).
+        
+        Links resolve against page_url, where the browser ended up after redirects.
+        cache_entry is only set for newly extracted pages and is (cache_key, entry).
+        """
+        cached = url_cache.get(cache_key)
+        content_hash = hashlib.blake2b(content.encode(), digest_size=16).digest()
+        unchanged = cached is not None and cached["content_hash"] == content_hash
+        if unchanged and (cached["links"] is not None or not want_links):
+            return cached["entities"], cached["links"], None
+        
+        is_new = not unchanged and content_hash not in seen_hashes
+        if is_new:
+            seen_hashes.add(content_hash)
+        
+        # Parse the page once for both link and entity extraction, off the event loop
+        entities, links = await asyncio.to_thread(
+            extract_page_sync, content, current_url, page_url, want_links, request_data if is_new else None
+        )
+        
+        if unchanged:
+            cached["links"] = links
+            return cached["entities"], links, None
+        if not is_new:
+            return [], links, None
+        
+        entry = {
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "content_hash": content_hash,
+            "entities": entities,
+            "links": links
+        }
+        return entities, links, (cache_key, entry)
+    
+    def cache_page(cache_key, entry):
+        url_cache[cache_key] = entry
+        url_cache.move_to_end(cache_key)
+        if len(url_cache) > URL_CACHE_MAX_ENTRIES:
+            url_cache.popitem(last=False)
+    
+    async def fetch_worker():
+        nonlocal in_flight
+        while True:
+            async with url_available:
+                await url_available.wait_for(lambda: job["pending_urls"] or in_flight == 0)
+                if not job["pending_urls"]:
+                    return
+                # The URL stays in seen_urls while in flight so it isn't queued again
+                current_url = job["pending_urls"].popleft()
+                in_flight += 1
+            
+            want_links = request_data["recursive"] and len(job["completed_urls"]) < request_data["max_depth"]
+            cache_key = (current_url, extraction_settings)
+            cached = url_cache.get(cache_key)
+            
+            try:
+                if (cached and (cached["links"] is not None or not want_links) and 
+                    await is_page_unchanged(current_url, cached, app.state.http_client)):
+                    # Unchanged since it was last extracted; the Knowledge Graph already has these entities
+                    url_cache.move_to_end(cache_key)
+                    page_result = None
+                else:
+                    page = await browser_pool.acquire()
+                    try:
+                        # Navigate to page
+                        response = await page.goto(current_url, {'waitUntil': 'networkidle0', 'timeout': 60000})
+                        
+                        # Get page content and the URL it was served from after redirects
+                        content = await page.content()
+                        page_url = page.url or current_url
+                    finally:
+                        await browser_pool.release(page)
+                    page_result = (content, response.headers if response else {}, page_url)
             except Exception as e:
-                logger.error(f"Error processing URL {current_url}: {str(e)}")
-                job["error_urls"].append({"url": current_url, "error": str(e)})
+                await finish_url(current_url, error=e)
+                continue
             
-            # Update progress
-            total_urls = len(job["completed_urls"]) + len(job["pending_urls"]) + len(job["error_urls"])
-            job["progress"] = len(job["completed_urls"]) / total_urls if total_urls > 0 else 1.0
+            if page_result is None:
+                await finish_url(current_url, cached["entities"], cached["links"] if want_links else None)
+            else:
+                await parse_queue.put((current_url, cache_key, want_links) + page_result)
+    
+    async def parse_worker():
+        while True:
+            item = await parse_queue.get()
+            if item is None:
+                return
+            
+            current_url = item[0]
+            try:
+                entities, links, cache_entry = await extract_page(*item)
+            except Exception as e:
+                await finish_url(current_url, error=e)
+                continue
+            await finish_url(current_url, entities, links, cache_entry)
+    
+    async def flush_pending(pending_entities, pending_relations, pending_pages):
+        # Pages are only cached once the Knowledge Graph has their entities, so
+        # a failed push is retried on the next run instead of being skipped
+        page_batch = list(pending_pages)
+        pending_pages.clear()
+        if await flush_to_kg(pending_entities, pending_relations, kg_client):
+            for cache_key, entry in page_batch:
+                cache_page(cache_key, entry)
+    
+    async def push_worker():
+        # Knowledge Graph payloads buffered across pages and pushed in batches
+        pending_entities = []
+        pending_relations = []
+        pending_pages = []
+        while True:
+            cache_entry = await push_queue.get()
+            if cache_entry is None:
+                break
+            split_kg_payload(cache_entry[1]["entities"], pending_entities, pending_relations)
+            pending_pages.append(cache_entry)
+            if (len(pending_entities) >= KG_ENTITY_BATCH_SIZE or 
+                len(pending_relations) >= KG_RELATION_BATCH_SIZE):
+                await flush_pending(pending_entities, pending_relations, pending_pages)
+        
+        # Push whatever is left in the buffers
+        await flush_pending(pending_entities, pending_relations, pending_pages)
+    
+    parse_tasks = [asyncio.create_task(parse_worker()) for _ in range(PARSE_WORKERS)]
+    push_task = asyncio.create_task(push_worker())
+    try:
+        # Fetch workers return once nothing is pending or in flight, so every
+        # fetched page has been parsed by then
+        await asyncio.gather(*[fetch_worker() for _ in range(browser_pool.size)])
+        
+        for _ in parse_tasks:
+            await parse_queue.put(None)
+        await asyncio.gather(*parse_tasks)
         
-        # Close browser
-        await browser.close()
+        await push_queue.put(None)
+        await push_task
         
         # Mark job as completed
         job["status"] = "completed"
@@ -217,9 +533,58 @@ async def run_extraction(extraction_id: str, kg_client: httpx.AsyncClient):
         logger.error(f"Error in extraction job {extraction_id}: {str(e)}")
         job["status"] = "failed"
         job["error"] = str(e)
+    finally:
+        for task in parse_tasks + [push_task]:
+            task.cancel()
+
+async def is_page_unchanged(url, cached, http_client):
+    """Revalidate a cached page with a conditional HEAD request using its ETag/Last-Modified."""
+    headers = {}
+    if cached["etag"]:
+        headers["If-None-Match"] = cached["etag"]
+    if cached["last_modified"]:
+        headers["If-Modified-Since"] = cached["last_modified"]
+    if not headers:
+        return False
+    
+    try:
+        response = await http_client.head(url, headers=headers, follow_redirects=True)
+    except httpx.HTTPError:
+        return False
+    
+    return response.status_code == 304
 
-async def extract_entities_from_content(
-    content: str, 
+def parse_page(content: str):
+    """Parse rendered page HTML into an lxml document."""
+    parser = getattr(thread_parsers, "parser", None)
+    if parser is None:
+        parser = thread_parsers.parser = lxml_html.HTMLParser(encoding="utf-8")
+    return lxml_html.document_fromstring(content.encode("utf-8", "replace"), parser=parser)
+
+def extract_page_sync(content, url, page_url, want_links, request_data):
+    """Parse rendered HTML and extract its links and, when request_data is given, its entities.
+    
+    Runs in a worker thread so large pages don't block the event loop.
+    """
+    page_root = parse_page(content)
+    links = extract_internal_links(page_root, page_url) if want_links else None
+    
+    entities = None
+    if request_data is not None:
+        entities = extract_entities_from_content(
+            page_root=page_root,
+            url=url,
+            company=request_data["company"],
+            company_type=request_data["company_type"],
+            product=request_data["product"],
+            product_type=request_data["product_type"],
+            selectors=request_data.get("selectors")
+        )
+    
+    return entities, links
+
+def extract_entities_from_content(
+    page_root, 
     url: str, 
     company: str, 
     company_type: str,
@@ -227,41 +592,50 @@ async def extract_entities_from_content(
     product_type: Optional[str] = None,
     selectors: Optional[Dict[str, str]] = None
 ) -> List[Dict[str, Any]]:
-    """Extract entities from HTML content."""
+    """Extract entities from a parsed page; readability cleans page_root in place."""
     entities = []
     
-    # Use readability to extract main content
-    doc = Document(content)
+    # Use readability to extract main content. Passing a parsed element needs
+    # readability-lxml>=0.8.4.1, and it strips hidden nodes from page_root in
+    # place, so links must already have been extracted from the tree
+    doc = Document(page_root)
     title = doc.title()
     main_content = doc.summary()
     
-    # Convert to soup for better parsing
-    soup = BeautifulSoup(main_content, 'lxml')
+    # summary() leaves the cleaned article tree on the document, so the
+    # extractors can use it without parsing the serialized summary again.
+    # doc.html is a readability internal rather than public API; recheck it
+    # when bumping the readability-lxml pin
+    root = doc.html
     
     # Extract text content
-    text_content = soup.get_text(separator='\n\n')
+    text_content = root.text_content()
     
-    # Convert to markdown for better structure
-    markdown_content = md(main_content)
+    # Collect endpoints, headings and best-practice sections in one walk
+    features = walk_and_extract(root)
     
     # Extract entities based on content type
-    if "api" in url.lower() or "reference" in url.lower():
+    categories = classify_url(url)
+    
+    if categories & CONTENT_API:
         # This is likely API documentation
-        api_entities = extract_api_entities(soup, url, company, product)
+        api_entities = extract_api_entities(features, url, company, product)
         entities.extend(api_entities)
     
-    if "guide" in url.lower() or "tutorial" in url.lower() or "docs" in url.lower():
+    if categories & CONTENT_GUIDE:
         # This is likely a guide or tutorial
-        guide_entities = extract_guide_entities(soup, url, company, product)
+        guide_entities = extract_guide_entities(features, url, company, product)
         entities.extend(guide_entities)
     
-    # Extract best practices if present
-    if "best-practices" in url.lower() or "best practices" in text_content.lower():
-        best_practice_entities = extract_best_practices(soup, url, company, product)
+    # Extract best practices if present; the body text is only scanned when the URL doesn't already say so
+    if categories & CONTENT_BEST_PRACTICES or BEST_PRACTICES_TEXT.search(text_content):
+        best_practice_entities = extract_best_practices(features, url, company, product)
         entities.extend(best_practice_entities)
     
     # If specific selectors provided, use them for extraction
     if selectors:
+        # CSS selectors still go through bs4's soupsieve support
+        soup = BeautifulSoup(main_content, HTML_PARSER, parse_only=build_selector_strainer(selectors))
         custom_entities = extract_custom_entities(soup, url, company, product, selectors)
         entities.extend(custom_entities)
     
@@ -296,26 +670,90 @@ async def extract_entities_from_content(
     
     return entities
 
-def extract_api_entities(soup, url, company, product=None):
-    """Extract API-related entities from documentation."""
-    entities = []
+def classify_url(url):
+    """Return the bitmask of content categories matched anywhere in the URL."""
+    categories = 0
+    for match in URL_CLASSIFIER.finditer(url):
+        categories |= URL_CATEGORY_FLAGS[match.lastgroup]
+    return categories
+
+def walk_and_extract(root):
+    """Collect what the API, guide and best-practice extractors need in a single pass over the tree.
+    
+    A best-practice heading opens a section that collects its following siblings
+    until a heading of another level or another best-practice heading; open
+    sections are tracked per parent since the walk is in document order.
+    """
+    code_endpoints = []
+    path_endpoints = []
+    headings = []
+    title = None
+    best_practices = []
+    open_sections = {}
+    
+    for elem in root.iter(etree.Element):
+        tag = elem.tag
+        parent = elem.getparent()
+        open_section = open_sections.get(parent)
+        
+        if tag == 'code':
+            # Code blocks with HTTP methods
+            text = elem.text_content()
+            if HTTP_METHOD.search(text):
+                code_endpoints.append(text.strip())
+        elif tag == 'title':
+            if title is None:
+                title = elem.text_content().strip()
+        elif tag in HEADING_TAGS or tag == 'dt':
+            text = elem.text_content()
+            
+            # Endpoint paths
+            if tag in PATH_TAGS and text.startswith('/') and ENDPOINT_PATH.match(text):
+                path_endpoints.append(text.strip())
+            
+            if tag in GUIDE_HEADING_TAGS:
+                headings.append(text.strip())
+            
+            if tag in HEADING_TAGS:
+                is_best_practice = BEST_PRACTICE_HEADING.search(text) is not None
+                
+                if open_section and (tag != open_section[0] or is_best_practice):
+                    del open_sections[parent]
+                    open_section = None
+                
+                if is_best_practice:
+                    # Text directly following the heading lives in its tail
+                    section_content = [elem.tail.strip()] if elem.tail and elem.tail.strip() else []
+                    best_practices.append({
+                        "title": text.strip(),
+                        "content": section_content
+                    })
+                    open_sections[parent] = (tag, section_content)
+                    continue
+        
+        if open_section:
+            section_content = open_section[1]
+            if elem.text_content().strip():
+                section_content.append(elem.text_content().strip())
+            if elem.tail and elem.tail.strip():
+                section_content.append(elem.tail.strip())
     
-    # Find API endpoints (common patterns in API docs)
-    endpoints = []
+    for practice in best_practices:
+        practice["content"] = "\n".join(practice["content"])
     
-    # Look for code blocks with HTTP methods
-    code_blocks = soup.find_all('code')
-    for block in code_blocks:
-        text = block.get_text()
-        if re.search(r'GET|POST|PUT|DELETE|PATCH', text):
-            endpoints.append(text.strip())
+    return {
+        "endpoints": code_endpoints + path_endpoints,
+        "headings": headings,
+        "title": title,
+        "best_practices": best_practices
+    }
+
+def extract_api_entities(features, url, company, product=None):
+    """Extract API-related entities from documentation."""
+    entities = []
     
-    # Look for endpoint paths
-    path_elements = soup.find_all(['h2', 'h3', 'dt'])
-    for elem in path_elements:
-        text = elem.get_text()
-        if re.search(r'^/\w+(/\w+)*(\{.*\})?$', text):
-            endpoints.append(text.strip())
+    # API endpoints: code blocks with HTTP methods, then endpoint paths
+    endpoints = features["endpoints"]
     
     # Create API entity if endpoints found
     if endpoints:
@@ -349,13 +787,12 @@ def extract_api_entities(soup, url, company, product=None):
     
     return entities
 
-def extract_guide_entities(soup, url, company, product=None):
+def extract_guide_entities(features, url, company, product=None):
     """Extract guide/tutorial information from documentation."""
     entities = []
     
-    # Extract headings to understand structure
-    headings = soup.find_all(['h1', 'h2', 'h3'])
-    heading_texts = [h.get_text().strip() for h in headings]
+    # Use headings to understand structure
+    heading_texts = features["headings"]
     
     # Try to identify guide type based on headings
     guide_type = "General Guide"
@@ -367,8 +804,7 @@ def extract_guide_entities(soup, url, company, product=None):
         guide_type = "How-To Guide"
     
     # Create guide entity
-    title = soup.find('title')
-    title_text = title.get_text().strip() if title else "Documentation Guide"
+    title_text = features["title"] if features["title"] is not None else "Documentation Guide"
     
     guide_entity = {
         "name": title_text,
@@ -399,32 +835,12 @@ def extract_guide_entities(soup, url, company, product=None):
     
     return entities
 
-def extract_best_practices(soup, url, company, product=None):
+def extract_best_practices(features, url, company, product=None):
     """Extract best practices from documentation."""
     entities = []
     
-    # Find sections that might contain best practices
-    best_practice_sections = []
-    
-    # Look for headings with "best practice" in them
-    for heading in soup.find_all(['h1', 'h2', 'h3', 'h4']):
-        if "best practice" in heading.get_text().lower() or "recommendation" in heading.get_text().lower():
-            section_content = []
-            
-            # Get all text until next heading of same or higher level
-            current = heading.next_sibling
-            while current and (current.name not in ['h1', 'h2', 'h3', 'h4'] or 
-                              (current.name == heading.name and 
-                               "best practice" not in current.get_text().lower() and 
-                               "recommendation" not in current.get_text().lower())):
-                if current.get_text().strip():
-                    section_content.append(current.get_text().strip())
-                current = current.next_sibling
-            
-            best_practice_sections.append({
-                "title": heading.get_text().strip(),
-                "content": "\n".join(section_content)
-            })
+    # Sections under best-practice headings
+    best_practice_sections = features["best_practices"]
     
     # Create entities for each best practice
     for idx, practice in enumerate(best_practice_sections):
@@ -458,6 +874,22 @@ def extract_best_practices(soup, url, company, product=None):
     
     return entities
 
+def build_selector_strainer(selectors):
+    """Build a SoupStrainer for the tags targeted by custom selectors.
+    
+    Returns None (full parse) when any selector needs more than a tag name,
+    since combinators and attribute/class filters depend on the rest of the tree.
+    """
+    tag_names = set()
+    for selector in selectors.values():
+        for part in selector.split(','):
+            part = part.strip()
+            if not SIMPLE_TAG_SELECTOR.match(part):
+                return None
+            tag_names.add(part.lower())
+    
+    return SoupStrainer(list(tag_names))
+
 def extract_custom_entities(soup, url, company, product, selectors):
     """Extract entities based on custom selectors."""
     entities = []
@@ -494,34 +926,34 @@ def extract_custom_entities(soup, url, company, product, selectors):
     
     return entities
 
-async def extract_internal_links(page, base_url):
-    """Extract internal links from the page."""
-    links = await page.evaluate('''() => {
-        const baseUrl = new URL(window.location.href);
-        const domain = baseUrl.hostname;
-        
-        const links = Array.from(document.querySelectorAll('a[href]'))
-            .map(a => a.href)
-            .filter(href => {
-                try {
-                    const url = new URL(href);
-                    return url.hostname === domain && url.pathname !== '/';
-                } catch (e) {
-                    return false;
-                }
-            });
-        
-        return [...new Set(links)]; // Return unique links
-    }''')
+def extract_internal_links(page_root, page_url):
+    """Extract internal links from the page, resolved the way the browser resolves a.href."""
+    domain = urlparse(page_url).hostname
+    
+    # Relative links resolve against <base href>, itself relative to the page URL
+    base_url = page_url
+    base_hrefs = BASE_HREF_XPATH(page_root)
+    if base_hrefs:
+        try:
+            base_url = urljoin(page_url, base_hrefs[0].strip())
+        except ValueError:
+            pass
     
-    return links
+    # A dict keeps the links unique in first-seen order
+    links = {}
+    for href in LINK_HREF_XPATH(page_root):
+        try:
+            link = urljoin(base_url, href.strip())
+            parsed = urlparse(link)
+        except ValueError:
+            continue
+        if parsed.hostname == domain and parsed.path != '/':
+            links[link] = None
+    
+    return list(links)
 
-async def push_to_knowledge_graph(entities, kg_client):
-    """Push extracted entities to the Knowledge Graph service."""
-    # Separate entities and relations
-    entity_objects = []
-    relation_objects = []
-    
+def split_kg_payload(entities, entity_objects, relation_objects):
+    """Sort extracted entities into Knowledge Graph entity and relation payloads."""
     for entity in entities:
         if "relationType" in entity:
             relation_objects.append({
@@ -531,27 +963,45 @@ async def push_to_knowledge_graph(entities, kg_client):
             })
         else:
             entity_objects.append(entity)
-    
-    # Push entities
-    if entity_objects:
+
+async def flush_to_kg(entity_objects, relation_objects, kg_client):
+    """Push buffered entities and relations to the Knowledge Graph service and clear the buffers.
+    
+    Returns whether every push succeeded.
+    """
+    # Take the batch before awaiting so concurrent workers keep filling fresh buffers
+    entity_batch = list(entity_objects)
+    relation_batch = list(relation_objects)
+    entity_objects.clear()
+    relation_objects.clear()
+    pushed = True
+    
+    # Push entities first so relations can match both endpoints
+    if entity_batch:
         try:
-            response = await kg_client.post(
+            async with kg_client.post(
                 f"{KG_SERVICE_URL}/entities",
-                json={"entities": entity_objects}
-            )
-            response.raise_for_status()
-            logger.info(f"Successfully pushed {len(entity_objects)} entities to Knowledge Graph")
+                data=orjson.dumps({"entities": entity_batch}),
+                headers=JSON_HEADERS
+            ) as response:
+                response.raise_for_status()
+            logger.info(f"Successfully pushed {len(entity_batch)} entities to Knowledge Graph")
         except Exception as e:
             logger.error(f"Error pushing entities to Knowledge Graph: {str(e)}")
+            pushed = False
     
     # Push relations
-    if relation_objects:
+    if relation_batch:
         try:
-            response = await kg_client.post(
+            async with kg_client.post(
                 f"{KG_SERVICE_URL}/relations",
-                json={"relations": relation_objects}
-            )
-            response.raise_for_status()
-            logger.info(f"Successfully pushed {len(relation_objects)} relations to Knowledge Graph")
+                data=orjson.dumps({"relations": relation_batch}),
+                headers=JSON_HEADERS
+            ) as response:
+                response.raise_for_status()
+            logger.info(f"Successfully pushed {len(relation_batch)} relations to Knowledge Graph")
         except Exception as e:
             logger.error(f"Error pushing relations to Knowledge Graph: {str(e)}")
+            pushed = False
+    
+    return pushed
@@ -2,6 +2,7 @@ from fastapi import FastAPI, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Optional
 import os
+import re
 from neo4j import GraphDatabase
 
 app = FastAPI(title="Knowledge Graph Service", description="Service for managing the Unified Data Architecture knowledge graph")
@@ -14,6 +15,12 @@ NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
 # Database driver
 driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
 
+# Characters with special meaning in Lucene query syntax
+LUCENE_SPECIAL_CHARS = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+# Runs of word characters, roughly the tokens the standard analyzer indexes
+WORD_TOKEN = re.compile(r'\w+')
+
 # Models
 class Entity(BaseModel):
     name: str
@@ -54,9 +61,26 @@ def get_db():
 
 @app.on_event("startup")
 def startup_db_client():
-    # Initialize constraints
+    # Initialize constraints and indexes
     with driver.session() as session:
         session.run("CREATE CONSTRAINT entity_name IF NOT EXISTS FOR (e:Entity) REQUIRE e.name IS UNIQUE")
+        session.run("CREATE CONSTRAINT observation_content IF NOT EXISTS FOR (o:Observation) REQUIRE o.content IS UNIQUE")
+        session.run("CREATE INDEX entity_type IF NOT EXISTS FOR (e:Entity) ON (e.entityType)")
+        session.run(
+            "CREATE FULLTEXT INDEX entity_search IF NOT EXISTS "
+            "FOR (n:Entity|Observation) ON EACH [n.name, n.entityType, n.content]"
+        )
+        
+        # Relations are stored as one relationship type per relationType;
+        # convert any generic RELATES_TO {type} relationships left from before
+        session.run(
+            """
+            MATCH (from:Entity)-[old:RELATES_TO]->(to:Entity)
+            WHERE old.type IS NOT NULL AND old.type <> 'RELATES_TO'
+            CALL apoc.merge.relationship(from, old.type, {}, {}, to, {}) YIELD rel
+            DELETE old
+            """
+        )
 
 @app.on_event("shutdown")
 def shutdown_db_client():
@@ -68,153 +92,157 @@ async def root():
 
 @app.post("/entities", response_model=List[Entity])
 async def create_entities(request: EntitiesRequest, db=Depends(get_db)):
-    created_entities = []
+    rows = [
+        {"name": entity.name, "entityType": entity.entityType, "observations": entity.observations}
+        for entity in request.entities
+    ]
     
-    for entity in request.entities:
-        result = db.run(
-            """
-            MERGE (e:Entity {name: $name})
-            SET e.entityType = $entityType
-            WITH e
-            UNWIND $observations as observation
+    result = db.run(
+        """
+        UNWIND $rows as row
+        MERGE (e:Entity {name: row.name})
+        SET e.entityType = row.entityType
+        FOREACH (observation IN row.observations |
             MERGE (o:Observation {content: observation})
             MERGE (e)-[:HAS_OBSERVATION]->(o)
-            RETURN e.name as name, e.entityType as entityType, collect(o.content) as observations
-            """,
-            name=entity.name,
-            entityType=entity.entityType,
-            observations=entity.observations
         )
-        
-        record = result.single()
-        created_entities.append(Entity(
+        RETURN e.name as name, e.entityType as entityType, row.observations as observations
+        """,
+        rows=rows
+    )
+    
+    return [
+        Entity(
             name=record["name"], 
             entityType=record["entityType"], 
             observations=record["observations"]
-        ))
-    
-    return created_entities
+        )
+        for record in result
+    ]
 
 @app.post("/relations", response_model=List[Relation])
 async def create_relations(request: RelationsRequest, db=Depends(get_db)):
-    created_relations = []
+    rows = [
+        {"from_entity": relation.from_entity, "relationType": relation.relationType, "to_entity": relation.to_entity}
+        for relation in request.relations
+    ]
     
-    for relation in request.relations:
-        result = db.run(
-            """
-            MATCH (from:Entity {name: $from_entity})
-            MATCH (to:Entity {name: $to_entity})
-            MERGE (from)-[r:RELATES_TO {type: $relationType}]->(to)
-            RETURN from.name as from_entity, r.type as relationType, to.name as to_entity
-            """,
-            from_entity=relation.from_entity,
-            relationType=relation.relationType,
-            to_entity=relation.to_entity
-        )
-        
-        record = result.single()
-        created_relations.append(Relation(
+    result = db.run(
+        """
+        UNWIND $rows as row
+        MATCH (from:Entity {name: row.from_entity})
+        MATCH (to:Entity {name: row.to_entity})
+        CALL apoc.merge.relationship(from, row.relationType, {}, {}, to, {}) YIELD rel
+        RETURN from.name as from_entity, type(rel) as relationType, to.name as to_entity
+        """,
+        rows=rows
+    )
+    
+    return [
+        Relation(
             from_entity=record["from_entity"],
             relationType=record["relationType"],
             to_entity=record["to_entity"]
-        ))
-    
-    return created_relations
+        )
+        for record in result
+    ]
 
 @app.post("/observations", response_model=List[ObservationRequest])
 async def add_observations(request: ObservationsRequest, db=Depends(get_db)):
-    added_observations = []
+    rows = [
+        {"entityName": observation_req.entityName, "contents": observation_req.contents}
+        for observation_req in request.observations
+    ]
     
-    for observation_req in request.observations:
-        result = db.run(
-            """
-            MATCH (e:Entity {name: $entityName})
-            WITH e
-            UNWIND $contents as content
+    result = db.run(
+        """
+        UNWIND $rows as row
+        MATCH (e:Entity {name: row.entityName})
+        FOREACH (content IN row.contents |
             MERGE (o:Observation {content: content})
             MERGE (e)-[:HAS_OBSERVATION]->(o)
-            RETURN e.name as entityName, collect(o.content) as contents
-            """,
-            entityName=observation_req.entityName,
-            contents=observation_req.contents
         )
-        
-        record = result.single()
-        added_observations.append(ObservationRequest(
+        RETURN e.name as entityName, row.contents as contents
+        """,
+        rows=rows
+    )
+    
+    return [
+        ObservationRequest(
             entityName=record["entityName"],
             contents=record["contents"]
-        ))
-    
-    return added_observations
+        )
+        for record in result
+    ]
 
 @app.delete("/entities", response_model=List[str])
 async def delete_entities(request: EntityNamesRequest, db=Depends(get_db)):
-    deleted_entities = []
-    
-    for entity_name in request.entityNames:
-        result = db.run(
-            """
-            MATCH (e:Entity {name: $name})
-            OPTIONAL MATCH (e)-[:HAS_OBSERVATION]->(o:Observation)
-            DETACH DELETE e, o
-            RETURN $name as name
-            """,
-            name=entity_name
-        )
-        
-        record = result.single()
-        deleted_entities.append(record["name"])
+    result = db.run(
+        """
+        UNWIND $names as name
+        MATCH (e:Entity {name: name})
+        OPTIONAL MATCH (e)-[:HAS_OBSERVATION]->(o:Observation)
+        DETACH DELETE e, o
+        RETURN DISTINCT name
+        """,
+        names=request.entityNames
+    )
     
-    return deleted_entities
+    return [record["name"] for record in result]
 
 @app.delete("/relations", response_model=List[Relation])
 async def delete_relations(request: DeleteRelationsRequest, db=Depends(get_db)):
-    deleted_relations = []
+    rows = [
+        {"from_entity": relation.from_entity, "relationType": relation.relationType, "to_entity": relation.to_entity}
+        for relation in request.relations
+    ]
     
-    for relation in request.relations:
-        result = db.run(
-            """
-            MATCH (from:Entity {name: $from_entity})-[r:RELATES_TO {type: $relationType}]->(to:Entity {name: $to_entity})
-            DELETE r
-            RETURN from.name as from_entity, $relationType as relationType, to.name as to_entity
-            """,
-            from_entity=relation.from_entity,
-            relationType=relation.relationType,
-            to_entity=relation.to_entity
-        )
-        
-        record = result.single()
-        deleted_relations.append(Relation(
+    result = db.run(
+        """
+        UNWIND $rows as row
+        MATCH (from:Entity {name: row.from_entity})-[r]->(to:Entity {name: row.to_entity})
+        WHERE type(r) = row.relationType
+        DELETE r
+        RETURN from.name as from_entity, row.relationType as relationType, to.name as to_entity
+        """,
+        rows=rows
+    )
+    
+    return [
+        Relation(
             from_entity=record["from_entity"],
             relationType=record["relationType"],
             to_entity=record["to_entity"]
-        ))
-    
-    return deleted_relations
+        )
+        for record in result
+    ]
 
 @app.delete("/observations", response_model=List[ObservationRequest])
 async def delete_observations(request: DeleteObservationsRequest, db=Depends(get_db)):
-    deleted_observations = []
+    rows = [
+        {"entityName": deletion.entityName, "contents": deletion.contents}
+        for deletion in request.deletions
+    ]
     
-    for deletion in request.deletions:
-        result = db.run(
-            """
-            MATCH (e:Entity {name: $entityName})-[r:HAS_OBSERVATION]->(o:Observation)
-            WHERE o.content IN $contents
-            DELETE r, o
-            RETURN e.name as entityName, collect(o.content) as contents
-            """,
-            entityName=deletion.entityName,
-            contents=deletion.contents
-        )
-        
-        record = result.single()
-        deleted_observations.append(ObservationRequest(
+    result = db.run(
+        """
+        UNWIND $rows as row
+        MATCH (e:Entity {name: row.entityName})-[r:HAS_OBSERVATION]->(o:Observation)
+        WHERE o.content IN row.contents
+        WITH e, r, o, o.content as content
+        DELETE r, o
+        RETURN e.name as entityName, collect(content) as contents
+        """,
+        rows=rows
+    )
+    
+    return [
+        ObservationRequest(
             entityName=record["entityName"],
             contents=record["contents"]
-        ))
-    
-    return deleted_observations
+        )
+        for record in result
+    ]
 
 @app.get("/graph", response_model=dict)
 async def read_graph(db=Depends(get_db)):
@@ -228,8 +256,8 @@ async def read_graph(db=Depends(get_db)):
     
     relations_result = db.run(
         """
-        MATCH (from:Entity)-[r:RELATES_TO]->(to:Entity)
-        RETURN from.name as from_entity, r.type as relationType, to.name as to_entity
+        MATCH (from:Entity)-[r]->(to:Entity)
+        RETURN from.name as from_entity, type(r) as relationType, to.name as to_entity
         """
     )
     
@@ -255,25 +283,41 @@ async def read_graph(db=Depends(get_db)):
     
     return {"entities": entities, "relations": relations}
 
+def build_fulltext_query(query):
+    """Require every word of a search query as a prefix.
+    
+    Prefix terms skip the analyzer, so the query is split into the same word
+    tokens the index holds (`gpt-4` into `gpt` and `4`); a query without any
+    word characters falls back to an escaped phrase.
+    """
+    terms = WORD_TOKEN.findall(query.lower())
+    if not terms:
+        return '"' + LUCENE_SPECIAL_CHARS.sub(r'\\\1', query) + '"'
+    return " AND ".join(f"{term}*" for term in terms)
+
 @app.get("/search", response_model=dict)
-async def search_nodes(query: str, db=Depends(get_db)):
+async def search_nodes(query: str, limit: int = 200, db=Depends(get_db)):
     if not query or len(query.strip()) == 0:
         raise HTTPException(status_code=400, detail="Search query cannot be empty")
     
-    search_term = f".*{query}.*"
+    search_term = build_fulltext_query(query)
     
     entities_result = db.run(
         """
-        MATCH (e:Entity)
-        WHERE e.name =~ $search_term OR e.entityType =~ $search_term
+        CALL db.index.fulltext.queryNodes('entity_search', $search_term) YIELD node, score
+        OPTIONAL MATCH (owner:Entity)-[:HAS_OBSERVATION]->(node)
+        WITH CASE WHEN node:Entity THEN node ELSE owner END as e, score
+        WHERE e IS NOT NULL
+        WITH e, max(score) as score
+        ORDER BY score DESC
+        LIMIT $limit
         OPTIONAL MATCH (e)-[:HAS_OBSERVATION]->(o:Observation)
-        RETURN e.name as name, e.entityType as entityType, collect(o.content) as observations
-        UNION
-        MATCH (e:Entity)-[:HAS_OBSERVATION]->(o:Observation)
-        WHERE o.content =~ $search_term
-        RETURN e.name as name, e.entityType as entityType, collect(o.content) as observations
+        WITH e, score, collect(o.content) as observations
+        RETURN e.name as name, e.entityType as entityType, observations
+        ORDER BY score DESC
         """,
-        search_term=search_term
+        search_term=search_term,
+        limit=limit
     )
     
     entities = [
@@ -1,33 +1,52 @@
-from fastapi import FastAPI, HTTPException, Depends, Query, Body, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Depends, Query, Body, BackgroundTasks, status
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field, validator
 from typing import List, Optional, Dict, Any, Union
 import os
 import json
+import orjson
+import ijson
 import yaml
 import re
-import aiofiles
+import asyncio
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 import uuid
+import time
+import shutil
+from collections import OrderedDict
 import semver
 import jinja2
+from jinja2.sandbox import SandboxedEnvironment
 from pathlib import Path
-from sqlalchemy import create_engine, Column, String, DateTime, Text, Integer, Boolean, ForeignKey
+from sqlalchemy import create_engine, event, text, inspect, or_, Column, String, DateTime, Text, Integer, Float, Boolean, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship, Session
-from jinja2 import Template
+from sqlalchemy.orm import sessionmaker, relationship, selectinload, Session
+
+# Use the libyaml C bindings when PyYAML was built with them
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Prompt Library Service", description="Service for managing the Unified Data Architecture prompt library")
+app = FastAPI(
+    title="Prompt Library Service",
+    description="Service for managing the Unified Data Architecture prompt library",
+    default_response_class=ORJSONResponse
+)
 
 # Configuration
 DATA_DIR = os.getenv("DATA_DIR", "/app/data")
 DB_URL = os.getenv("DB_URL", f"sqlite:///{DATA_DIR}/prompts.db")
 SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8002"))
+TEMPLATE_CACHE_SIZE = int(os.getenv("TEMPLATE_CACHE_SIZE", "512"))
+IMPORT_WRITE_CONCURRENCY = int(os.getenv("IMPORT_WRITE_CONCURRENCY", "32"))
+PROMPT_CACHE_SIZE = int(os.getenv("PROMPT_CACHE_SIZE", "1024"))
+PROMPT_CACHE_TTL = float(os.getenv("PROMPT_CACHE_TTL", "30"))
 
 # Ensure data directory exists
 os.makedirs(DATA_DIR, exist_ok=True)
@@ -35,8 +54,28 @@ os.makedirs(f"{DATA_DIR}/prompts", exist_ok=True)
 os.makedirs(f"{DATA_DIR}/templates", exist_ok=True)
 os.makedirs(f"{DATA_DIR}/versions", exist_ok=True)
 
+# SQLite tuning applied to every new connection: WAL lets readers run alongside
+# the writer, and synchronous=NORMAL avoids an fsync on every commit in WAL mode
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456"
+]
+
 # Database setup
-engine = create_engine(DB_URL)
+IS_SQLITE = DB_URL.startswith("sqlite")
+engine = create_engine(DB_URL, connect_args={"check_same_thread": False} if IS_SQLITE else {})
+
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -52,26 +91,177 @@ class PromptModel(Base):
     tags = Column(String)  # Stored as JSON
     created_at = Column(DateTime)
     updated_at = Column(DateTime)
-    current_version = Column(String)
-    versions = relationship("PromptVersionModel", back_populates="prompt")
+    current_version = Column(String)  # Version string, kept for display
+    current_version_id = Column(String, ForeignKey("prompt_versions.id", use_alter=True), index=True)
+    versions = relationship("PromptVersionModel", back_populates="prompt", foreign_keys="PromptVersionModel.prompt_id")
 
 class PromptVersionModel(Base):
     __tablename__ = "prompt_versions"
+    __table_args__ = (
+        Index("ix_pv_prompt_version", "prompt_id", "version", unique=True),
+        Index("ix_pv_prompt_created", "prompt_id", "created_at"),
+    )
     
     id = Column(String, primary_key=True, index=True)
     prompt_id = Column(String, ForeignKey("prompts.id"))
-    version = Column(String, index=True)
+    version = Column(String)
     content = Column(Text)
     template = Column(Boolean, default=False)
     template_schema = Column(String)  # Stored as JSON
     parameters = Column(String)  # Stored as JSON
     created_at = Column(DateTime)
-    performance_metrics = Column(String)  # Stored as JSON
-    prompt = relationship("PromptModel", back_populates="versions")
+    performance_metrics = Column(String)  # Legacy JSON list, migrated to prompt_metrics
+    prompt = relationship("PromptModel", back_populates="versions", foreign_keys=[prompt_id])
+    metrics = relationship("PromptMetricModel", order_by="PromptMetricModel.id")
+
+class PromptMetricModel(Base):
+    __tablename__ = "prompt_metrics"
+    __table_args__ = (Index("ix_metric_version", "version_id"),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    version_id = Column(String, ForeignKey("prompt_versions.id"))
+    metric = Column(String)
+    value = Column(Float)
+    model = Column(String)
+    notes = Column(Text)
+    timestamp = Column(DateTime)
+
+class PromptTagModel(Base):
+    """One row per tag of a prompt, kept in sync with prompts.tags by triggers on SQLite and by the write paths elsewhere"""
+    __tablename__ = "prompt_tags"
+    __table_args__ = (Index("ix_prompt_tags_tag", "tag", "prompt_id"),)
+    
+    prompt_id = Column(String, ForeignKey("prompts.id"), primary_key=True)
+    tag = Column(String, primary_key=True)
+
+# Triggers that expand the prompts.tags JSON array into prompt_tags rows
+PROMPT_TAG_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS prompt_tags_insert AFTER INSERT ON prompts
+    BEGIN
+        INSERT INTO prompt_tags (prompt_id, tag)
+        SELECT DISTINCT new.id, value FROM json_each(new.tags) WHERE new.tags IS NOT NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS prompt_tags_update AFTER UPDATE OF tags ON prompts
+    BEGIN
+        DELETE FROM prompt_tags WHERE prompt_id = old.id;
+        INSERT INTO prompt_tags (prompt_id, tag)
+        SELECT DISTINCT new.id, value FROM json_each(new.tags) WHERE new.tags IS NOT NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS prompt_tags_delete AFTER DELETE ON prompts
+    BEGIN
+        DELETE FROM prompt_tags WHERE prompt_id = old.id;
+    END
+    """
+]
+
+def add_prompt_tags(db, prompt_tags):
+    """Insert prompt_tags rows for (prompt_id, tags) pairs on databases without the SQLite triggers"""
+    if IS_SQLITE:
+        return
+    db.bulk_insert_mappings(PromptTagModel, [
+        {"prompt_id": prompt_id, "tag": tag}
+        for prompt_id, tags in prompt_tags
+        for tag in dict.fromkeys(tags)
+    ])
+
+def replace_prompt_tags(db, prompt_id, tags):
+    """Rewrite a prompt's prompt_tags rows on databases without the SQLite triggers"""
+    if IS_SQLITE:
+        return
+    db.query(PromptTagModel).filter(PromptTagModel.prompt_id == prompt_id).delete(synchronize_session=False)
+    add_prompt_tags(db, [(prompt_id, tags)])
+
+def add_missing_columns():
+    """Add model columns missing from existing tables and return them as (table, column) pairs"""
+    inspector = inspect(engine)
+    added = []
+    
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    added.append((table.name, column.name))
+    
+    return added
 
 # Create tables
+has_metrics_table = inspect(engine).has_table(PromptMetricModel.__tablename__)
+has_tags_table = inspect(engine).has_table(PromptTagModel.__tablename__)
 Base.metadata.create_all(bind=engine)
 
+# create_all skips existing tables, so add columns and indexes introduced since they were created
+added_columns = add_missing_columns()
+
+if ("prompts", "current_version_id") in added_columns:
+    with engine.begin() as connection:
+        connection.execute(text(
+            "UPDATE prompts SET current_version_id = ("
+            "SELECT prompt_versions.id FROM prompt_versions "
+            "WHERE prompt_versions.prompt_id = prompts.id AND prompt_versions.version = prompts.current_version)"
+        ))
+
+for table in Base.metadata.sorted_tables:
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+if IS_SQLITE:
+    with engine.begin() as connection:
+        for trigger in PROMPT_TAG_TRIGGERS:
+            connection.execute(text(trigger))
+        
+        # Backfill tags of prompts stored before the triggers existed
+        connection.execute(text(
+            "INSERT OR IGNORE INTO prompt_tags (prompt_id, tag) "
+            "SELECT DISTINCT prompts.id, json_each.value FROM prompts, json_each(prompts.tags) "
+            "WHERE prompts.tags IS NOT NULL"
+        ))
+        
+        # Move metrics out of the legacy performance_metrics JSON column once
+        if not has_metrics_table:
+            connection.execute(text(
+                "INSERT INTO prompt_metrics (version_id, metric, value, model, notes, timestamp) "
+                "SELECT prompt_versions.id, json_extract(je.value, '$.metric'), json_extract(je.value, '$.value'), "
+                "json_extract(je.value, '$.model'), json_extract(je.value, '$.notes'), "
+                "replace(json_extract(je.value, '$.timestamp'), 'T', ' ') "
+                "FROM prompt_versions, json_each(prompt_versions.performance_metrics) je "
+                "WHERE prompt_versions.performance_metrics IS NOT NULL "
+                "ORDER BY prompt_versions.rowid, je.key"
+            ))
+else:
+    with SessionLocal() as db:
+        # Backfill tags of prompts stored before the prompt_tags table existed
+        if not has_tags_table:
+            prompts = db.query(PromptModel.id, PromptModel.tags).filter(PromptModel.tags.isnot(None)).all()
+            add_prompt_tags(db, [(prompt_id, json.loads(tags)) for prompt_id, tags in prompts])
+        
+        # Move metrics out of the legacy performance_metrics JSON column once
+        if not has_metrics_table:
+            versions = db.query(PromptVersionModel.id, PromptVersionModel.performance_metrics).filter(
+                PromptVersionModel.performance_metrics.isnot(None)
+            ).all()
+            db.bulk_insert_mappings(PromptMetricModel, [
+                {
+                    "version_id": version_id,
+                    "metric": metric.get("metric"),
+                    "value": metric.get("value"),
+                    "model": metric.get("model"),
+                    "notes": metric.get("notes"),
+                    "timestamp": datetime.fromisoformat(metric["timestamp"]) if metric.get("timestamp") else None
+                }
+                for version_id, performance_metrics in versions
+                for metric in orjson.loads(performance_metrics)
+            ])
+        
+        db.commit()
+
 # Dependency for database session
 def get_db():
     db = SessionLocal()
@@ -155,14 +345,64 @@ class PromptRender(BaseModel):
     parameters: Dict[str, Any]
 
 # Helper functions
+async def write_bytes(path, data):
+    """Write a whole file in a single worker-thread call"""
+    await asyncio.to_thread(Path(path).write_bytes, data)
+
+def find_prompt(db, prompt_id_or_name):
+    """Look up a prompt by ID or, failing that, by name in a single query"""
+    return db.query(PromptModel).filter(
+        or_(PromptModel.id == prompt_id_or_name, PromptModel.name == prompt_id_or_name)
+    ).order_by((PromptModel.id == prompt_id_or_name).desc()).first()
+
+# Render lookups by prompt ID or name, least recently used first: key -> (expires_at, entry).
+# Entries are dropped when their prompt changes here; the TTL bounds staleness across processes.
+prompt_cache = OrderedDict()
+
+def get_cached_prompt(key):
+    """Return the cached render entry for a prompt ID or name if it hasn't expired"""
+    cached = prompt_cache.get(key)
+    if cached is None:
+        return None
+    
+    expires_at, entry = cached
+    if expires_at < time.monotonic():
+        del prompt_cache[key]
+        return None
+    
+    prompt_cache.move_to_end(key)
+    return entry
+
+def cache_prompt(key, entry):
+    """Cache a render entry under a prompt ID or name"""
+    prompt_cache[key] = (time.monotonic() + PROMPT_CACHE_TTL, entry)
+    prompt_cache.move_to_end(key)
+    if len(prompt_cache) > PROMPT_CACHE_SIZE:
+        prompt_cache.popitem(last=False)
+
+def invalidate_cached_prompt(db_prompt):
+    """Drop cached render entries for a prompt under both its ID and its name"""
+    prompt_cache.pop(db_prompt.id, None)
+    prompt_cache.pop(db_prompt.name, None)
+
+def metric_model_to_pydantic(db_metric):
+    """Convert a stored metric row to a Pydantic model"""
+    return PerformanceMetric(
+        metric=db_metric.metric,
+        value=db_metric.value,
+        timestamp=db_metric.timestamp,
+        model=db_metric.model,
+        notes=db_metric.notes
+    )
+
 def prompt_model_to_pydantic(db_prompt, include_versions=True):
     """Convert database model to Pydantic model"""
     versions = []
     if include_versions and db_prompt.versions:
         for v in db_prompt.versions:
-            performance_metrics = json.loads(v.performance_metrics) if v.performance_metrics else []
-            template_schema = json.loads(v.template_schema) if v.template_schema else None
-            parameters = json.loads(v.parameters) if v.parameters else None
+            performance_metrics = [metric_model_to_pydantic(m) for m in v.metrics]
+            template_schema = orjson.loads(v.template_schema) if v.template_schema else None
+            parameters = orjson.loads(v.parameters) if v.parameters else None
             
             versions.append(PromptVersion(
                 version=v.version,
@@ -180,27 +420,63 @@ def prompt_model_to_pydantic(db_prompt, include_versions=True):
         description=db_prompt.description,
         category=db_prompt.category,
         model=db_prompt.model,
-        tags=json.loads(db_prompt.tags) if db_prompt.tags else [],
+        tags=orjson.loads(db_prompt.tags) if db_prompt.tags else [],
         created_at=db_prompt.created_at,
         updated_at=db_prompt.updated_at,
         current_version=db_prompt.current_version,
         versions=versions
     )
 
-def render_template(template_content, parameters):
+# Shared sandboxed Jinja2 environment; missing parameters fail the render instead of rendering empty
+jinja_env = SandboxedEnvironment(undefined=jinja2.StrictUndefined, auto_reload=False)
+
+# Compiled templates by version id, least recently used first; version content never changes
+compiled_templates = OrderedDict()
+
+def compile_template(version_id, template_content):
+    """Return the compiled template for a version, compiling it on first use"""
+    template = compiled_templates.get(version_id)
+    if template is not None:
+        compiled_templates.move_to_end(version_id)
+        return template
+    
+    template = jinja_env.from_string(template_content)
+    compiled_templates[version_id] = template
+    if len(compiled_templates) > TEMPLATE_CACHE_SIZE:
+        compiled_templates.popitem(last=False)
+    return template
+
+def precompile_template(version_id, template_content):
+    """Compile a template when its version is written so the first render skips parsing"""
+    try:
+        compile_template(version_id, template_content)
+    except jinja2.TemplateSyntaxError as e:
+        # Reported to the caller when the version is rendered
+        logger.warning(f"Template for version {version_id} does not compile: {str(e)}")
+
+def render_template(version_id, template_content, parameters):
     """Render a Jinja2 template with provided parameters"""
     try:
-        template = Template(template_content)
+        template = compile_template(version_id, template_content)
         return template.render(**parameters)
     except Exception as e:
         logger.error(f"Error rendering template: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Error rendering template: {str(e)}")
 
+# Plain MAJOR.MINOR.PATCH versions, without pre-release or build metadata
+SEMVER_CORE = re.compile(r"(0|[1-9][0-9]*)\.(0|[1-9][0-9]*)\.(0|[1-9][0-9]*)")
+
 def generate_new_version(current_version):
     """Generate a new semantic version based on the current version"""
     if not current_version:
         return "1.0.0"
     
+    # Fast path for plain versions; semver handles the rest
+    match = SEMVER_CORE.fullmatch(current_version)
+    if match:
+        major, minor, patch = match.groups()
+        return f"{major}.{minor}.{int(patch) + 1}"
+    
     try:
         ver = semver.VersionInfo.parse(current_version)
         return str(ver.bump_patch())
@@ -209,62 +485,40 @@ def generate_new_version(current_version):
         # If we can't parse the current version, start from 1.0.0
         return "1.0.0"
 
-@app.get("/")
-async def root():
-    return {"message": "Prompt Library Service API"}
+def utc_now():
+    """Current UTC time as a naive datetime, matching the stored timestamps"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
-@app.post("/prompts", response_model=Prompt, status_code=status.HTTP_201_CREATED)
-async def create_prompt(prompt: PromptCreate, db: Session = Depends(get_db)):
-    # Check if prompt with given name already exists
-    existing_prompt = db.query(PromptModel).filter(PromptModel.name == prompt.name).first()
-    if existing_prompt:
-        raise HTTPException(status_code=400, detail=f"Prompt with name '{prompt.name}' already exists")
-    
+def new_prompt_rows(prompt, now):
+    """Build the database rows and metadata file contents for a new prompt and its first version"""
     prompt_id = str(uuid.uuid4())
-    version = "1.0.0"
-    now = datetime.utcnow()
-    
-    # Create new prompt in database
-    db_prompt = PromptModel(
-        id=prompt_id,
-        name=prompt.name,
-        description=prompt.description,
-        category=prompt.category,
-        model=prompt.model,
-        tags=json.dumps(prompt.tags),
-        created_at=now,
-        updated_at=now,
-        current_version=version
-    )
-    db.add(db_prompt)
-    
-    # Create first version
     version_id = str(uuid.uuid4())
-    template_schema = json.dumps(prompt.template_schema) if prompt.template_schema else None
-    
-    db_version = PromptVersionModel(
-        id=version_id,
-        prompt_id=prompt_id,
-        version=version,
-        content=prompt.content,
-        template=prompt.is_template,
-        template_schema=template_schema,
-        parameters=None,
-        created_at=now,
-        performance_metrics=json.dumps([])
-    )
-    db.add(db_version)
-    db.commit()
+    version = "1.0.0"
+    now_iso = now.isoformat()
     
-    # Save prompt content to file
-    prompt_dir = Path(f"{DATA_DIR}/prompts/{prompt_id}")
-    prompt_dir.mkdir(exist_ok=True)
+    prompt_row = {
+        "id": prompt_id,
+        "name": prompt.name,
+        "description": prompt.description,
+        "category": prompt.category,
+        "model": prompt.model,
+        "tags": json.dumps(prompt.tags),
+        "created_at": now,
+        "updated_at": now,
+        "current_version": version
+    }
     
-    version_file = prompt_dir / f"{version}.txt"
-    async with aiofiles.open(version_file, "w") as f:
-        await f.write(prompt.content)
+    version_row = {
+        "id": version_id,
+        "prompt_id": prompt_id,
+        "version": version,
+        "content": prompt.content,
+        "template": prompt.is_template,
+        "template_schema": json.dumps(prompt.template_schema) if prompt.template_schema else None,
+        "parameters": None,
+        "created_at": now
+    }
     
-    # Save metadata
     metadata = {
         "id": prompt_id,
         "name": prompt.name,
@@ -272,20 +526,130 @@ async def create_prompt(prompt: PromptCreate, db: Session = Depends(get_db)):
         "category": prompt.category,
         "model": prompt.model,
         "tags": prompt.tags,
-        "created_at": now.isoformat(),
-        "updated_at": now.isoformat(),
+        "created_at": now_iso,
+        "updated_at": now_iso,
         "current_version": version,
         "versions": [{
             "version": version,
-            "created_at": now.isoformat(),
+            "created_at": now_iso,
             "template": prompt.is_template,
             "template_schema": prompt.template_schema
         }]
     }
     
-    metadata_file = prompt_dir / "metadata.json"
-    async with aiofiles.open(metadata_file, "w") as f:
-        await f.write(json.dumps(metadata, indent=2))
+    return prompt_row, version_row, metadata
+
+def build_prompt_metadata(db_prompt):
+    """Build the metadata.json contents for a prompt from its database state"""
+    return {
+        "id": db_prompt.id,
+        "name": db_prompt.name,
+        "description": db_prompt.description,
+        "category": db_prompt.category,
+        "model": db_prompt.model,
+        "tags": orjson.loads(db_prompt.tags) if db_prompt.tags else [],
+        "created_at": db_prompt.created_at.isoformat(),
+        "updated_at": db_prompt.updated_at.isoformat(),
+        "current_version": db_prompt.current_version,
+        "versions": [
+            {
+                "version": v.version,
+                "created_at": v.created_at.isoformat(),
+                "template": v.template,
+                "template_schema": orjson.loads(v.template_schema) if v.template_schema else None
+            }
+            for v in db_prompt.versions
+        ]
+    }
+
+# Prompt directories known to exist, so repeat writes skip the mkdir syscall
+known_prompt_dirs = set()
+
+async def ensure_prompt_dir(prompt_id):
+    """Return a prompt's data directory, creating it on first use"""
+    prompt_dir = Path(f"{DATA_DIR}/prompts/{prompt_id}")
+    if prompt_id not in known_prompt_dirs:
+        await asyncio.to_thread(prompt_dir.mkdir, exist_ok=True)
+        known_prompt_dirs.add(prompt_id)
+    return prompt_dir
+
+async def write_metadata(prompt_id, metadata):
+    """Save a prompt's metadata file; scheduled as a background task off the request path"""
+    prompt_dir = await ensure_prompt_dir(prompt_id)
+    
+    await write_bytes(prompt_dir / "metadata.json", json.dumps(metadata, indent=2).encode())
+
+async def write_prompt_files(prompt_id, version, content, metadata=None):
+    """Save a prompt version's content and, if given, the prompt's metadata to files"""
+    prompt_dir = await ensure_prompt_dir(prompt_id)
+    
+    await write_bytes(prompt_dir / f"{version}.txt", content.encode())
+    if metadata is not None:
+        await write_metadata(prompt_id, metadata)
+
+def prompt_from_import_data(prompt_data):
+    """Build a prompt from one entry of an import file"""
+    return PromptCreate(
+        name=prompt_data['name'],
+        description=prompt_data.get('description', ''),
+        category=prompt_data.get('category', 'General'),
+        model=prompt_data.get('model', 'Any'),
+        tags=prompt_data.get('tags', []),
+        content=prompt_data['content'],
+        is_template=prompt_data.get('is_template', False),
+        template_schema=prompt_data.get('template_schema')
+    )
+
+def load_import_file(path):
+    """Parse a JSON or YAML import file holding one prompt or a list of prompts; runs in a worker thread"""
+    if path.suffix == '.json':
+        # Stream JSON entries so a large export is never held as one parsed document
+        with open(path, "rb") as f:
+            while (char := f.read(1)) and char.isspace():
+                pass
+            f.seek(0)
+            
+            # Handle both single prompt and list of prompts
+            prefix = "item" if char == b"[" else ""
+            return [prompt_from_import_data(prompt_data) for prompt_data in ijson.items(f, prefix, use_float=True)]
+    
+    data = yaml.load(path.read_bytes(), Loader=YamlLoader)
+    
+    # Handle both single prompt and list of prompts
+    prompts_data = data if isinstance(data, list) else [data]
+    
+    return [prompt_from_import_data(prompt_data) for prompt_data in prompts_data]
+
+@app.get("/")
+async def root():
+    return {"message": "Prompt Library Service API"}
+
+@app.post("/prompts", response_model=Prompt, status_code=status.HTTP_201_CREATED)
+async def create_prompt(prompt: PromptCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    # Check if prompt with given name already exists
+    existing_prompt = db.query(PromptModel).filter(PromptModel.name == prompt.name).first()
+    if existing_prompt:
+        raise HTTPException(status_code=400, detail=f"Prompt with name '{prompt.name}' already exists")
+    
+    prompt_row, version_row, metadata = new_prompt_rows(prompt, utc_now())
+    
+    # Create new prompt and its first version in database
+    db_prompt = PromptModel(**prompt_row)
+    db.add(db_prompt)
+    db.add(PromptVersionModel(**version_row))
+    db.flush()
+    add_prompt_tags(db, [(prompt_row["id"], prompt.tags)])
+    
+    # The version row references the prompt, so the prompt points at it only once both exist
+    db_prompt.current_version_id = version_row["id"]
+    db.commit()
+    
+    if prompt.is_template:
+        precompile_template(version_row["id"], prompt.content)
+    
+    # Save prompt content to file; metadata is written after the response is sent
+    await write_prompt_files(prompt_row["id"], version_row["version"], prompt.content)
+    background_tasks.add_task(write_metadata, prompt_row["id"], metadata)
     
     return prompt_model_to_pydantic(db_prompt)
 
@@ -309,28 +673,38 @@ async def list_prompts(
     
     if tag:
         # Filter prompts that have the specified tag
-        query = query.filter(PromptModel.tags.like(f'%"{tag}"%'))
+        query = query.join(PromptTagModel, PromptTagModel.prompt_id == PromptModel.id).filter(PromptTagModel.tag == tag)
+    
+    if include_versions:
+        # Load versions and their metrics for the whole page in two queries
+        query = query.options(selectinload(PromptModel.versions).selectinload(PromptVersionModel.metrics))
     
     prompts = query.offset(skip).limit(limit).all()
-    return [prompt_model_to_pydantic(p, include_versions) for p in prompts]
+    
+    # Already built from the response models, so skip FastAPI's re-validation
+    return ORJSONResponse([prompt_model_to_pydantic(p, include_versions).model_dump() for p in prompts])
 
 @app.get("/prompts/{prompt_id}", response_model=Prompt)
 async def get_prompt(prompt_id: str, include_versions: bool = True, db: Session = Depends(get_db)):
-    prompt = db.query(PromptModel).filter(PromptModel.id == prompt_id).first()
-    if not prompt:
-        prompt = db.query(PromptModel).filter(PromptModel.name == prompt_id).first()
-        
+    prompt = find_prompt(db, prompt_id)
     if not prompt:
         raise HTTPException(status_code=404, detail=f"Prompt with ID or name '{prompt_id}' not found")
     
-    return prompt_model_to_pydantic(prompt, include_versions)
+    return ORJSONResponse(prompt_model_to_pydantic(prompt, include_versions).model_dump())
 
 @app.put("/prompts/{prompt_id}", response_model=Prompt)
-async def update_prompt(prompt_id: str, prompt_update: PromptUpdate, db: Session = Depends(get_db)):
+async def update_prompt(
+    prompt_id: str, 
+    prompt_update: PromptUpdate, 
+    background_tasks: BackgroundTasks, 
+    db: Session = Depends(get_db)
+):
     prompt = db.query(PromptModel).filter(PromptModel.id == prompt_id).first()
     if not prompt:
         raise HTTPException(status_code=404, detail=f"Prompt with ID '{prompt_id}' not found")
     
+    invalidate_cached_prompt(prompt)
+    
     # Update fields if provided
     if prompt_update.name is not None:
         # Check if the new name already exists
@@ -350,53 +724,51 @@ async def update_prompt(prompt_id: str, prompt_update: PromptUpdate, db: Session
         
     if prompt_update.tags is not None:
         prompt.tags = json.dumps(prompt_update.tags)
+        replace_prompt_tags(db, prompt_id, prompt_update.tags)
     
-    prompt.updated_at = datetime.utcnow()
+    now = utc_now()
+    prompt.updated_at = now
     db.commit()
     
-    # Update metadata file
-    metadata_file = Path(f"{DATA_DIR}/prompts/{prompt_id}/metadata.json")
-    if metadata_file.exists():
-        async with aiofiles.open(metadata_file, "r") as f:
-            metadata = json.loads(await f.read())
-            
-        if prompt_update.name is not None:
-            metadata["name"] = prompt_update.name
-        if prompt_update.description is not None:
-            metadata["description"] = prompt_update.description
-        if prompt_update.category is not None:
-            metadata["category"] = prompt_update.category
-        if prompt_update.model is not None:
-            metadata["model"] = prompt_update.model
-        if prompt_update.tags is not None:
-            metadata["tags"] = prompt_update.tags
-            
-        metadata["updated_at"] = datetime.utcnow().isoformat()
-        
-        async with aiofiles.open(metadata_file, "w") as f:
-            await f.write(json.dumps(metadata, indent=2))
+    # Regenerate metadata file after the response is sent
+    background_tasks.add_task(write_metadata, prompt_id, build_prompt_metadata(prompt))
     
     return prompt_model_to_pydantic(prompt)
 
+@app.get("/prompts/{prompt_id}/metadata", response_model=dict)
+async def get_prompt_metadata(prompt_id: str, db: Session = Depends(get_db)):
+    prompt = find_prompt(db, prompt_id)
+    if not prompt:
+        raise HTTPException(status_code=404, detail=f"Prompt with ID or name '{prompt_id}' not found")
+    
+    return build_prompt_metadata(prompt)
+
 @app.delete("/prompts/{prompt_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_prompt(prompt_id: str, db: Session = Depends(get_db)):
     prompt = db.query(PromptModel).filter(PromptModel.id == prompt_id).first()
     if not prompt:
         raise HTTPException(status_code=404, detail=f"Prompt with ID '{prompt_id}' not found")
     
-    # Delete all versions
-    db.query(PromptVersionModel).filter(PromptVersionModel.prompt_id == prompt_id).delete()
+    invalidate_cached_prompt(prompt)
+    
+    # Stop referencing the current version before it is deleted
+    prompt.current_version_id = None
+    db.flush()
+    
+    # Delete all versions and their metrics
+    version_ids = db.query(PromptVersionModel.id).filter(PromptVersionModel.prompt_id == prompt_id)
+    db.query(PromptMetricModel).filter(PromptMetricModel.version_id.in_(version_ids.scalar_subquery())).delete(synchronize_session=False)
+    db.query(PromptVersionModel).filter(PromptVersionModel.prompt_id == prompt_id).delete(synchronize_session=False)
+    replace_prompt_tags(db, prompt_id, [])
     
     # Delete the prompt
     db.delete(prompt)
     db.commit()
     
     # Delete files
+    known_prompt_dirs.discard(prompt_id)
     prompt_dir = Path(f"{DATA_DIR}/prompts/{prompt_id}")
-    if prompt_dir.exists():
-        for file in prompt_dir.glob("*"):
-            file.unlink()
-        prompt_dir.rmdir()
+    await asyncio.to_thread(shutil.rmtree, prompt_dir, ignore_errors=True)
     
     return None
 
@@ -404,15 +776,18 @@ async def delete_prompt(prompt_id: str, db: Session = Depends(get_db)):
 async def create_prompt_version(
     prompt_id: str, 
     version_create: PromptVersionCreate, 
+    background_tasks: BackgroundTasks, 
     db: Session = Depends(get_db)
 ):
     prompt = db.query(PromptModel).filter(PromptModel.id == prompt_id).first()
     if not prompt:
         raise HTTPException(status_code=404, detail=f"Prompt with ID '{prompt_id}' not found")
     
+    invalidate_cached_prompt(prompt)
+    
     # Generate new version number
     new_version = generate_new_version(prompt.current_version)
-    now = datetime.utcnow()
+    now = utc_now()
     
     # Convert template schema and parameters to JSON
     template_schema = json.dumps(version_create.template_schema) if version_create.template_schema else None
@@ -428,41 +803,25 @@ async def create_prompt_version(
         template=version_create.template,
         template_schema=template_schema,
         parameters=parameters,
-        created_at=now,
-        performance_metrics=json.dumps([])
+        created_at=now
     )
     db.add(db_version)
+    db.flush()
     
     # Update prompt with new current version
     prompt.current_version = new_version
+    prompt.current_version_id = version_id
     prompt.updated_at = now
     db.commit()
     
-    # Save version to file
-    prompt_dir = Path(f"{DATA_DIR}/prompts/{prompt_id}")
-    prompt_dir.mkdir(exist_ok=True)
+    if version_create.template:
+        precompile_template(version_id, version_create.content)
     
-    version_file = prompt_dir / f"{new_version}.txt"
-    async with aiofiles.open(version_file, "w") as f:
-        await f.write(version_create.content)
+    # Save version to file
+    await write_prompt_files(prompt_id, new_version, version_create.content)
     
-    # Update metadata
-    metadata_file = prompt_dir / "metadata.json"
-    if metadata_file.exists():
-        async with aiofiles.open(metadata_file, "r") as f:
-            metadata = json.loads(await f.read())
-            
-        metadata["current_version"] = new_version
-        metadata["updated_at"] = now.isoformat()
-        metadata["versions"].append({
-            "version": new_version,
-            "created_at": now.isoformat(),
-            "template": version_create.template,
-            "template_schema": version_create.template_schema
-        })
-        
-        async with aiofiles.open(metadata_file, "w") as f:
-            await f.write(json.dumps(metadata, indent=2))
+    # Regenerate metadata file after the response is sent
+    background_tasks.add_task(write_metadata, prompt_id, build_prompt_metadata(prompt))
     
     return PromptVersion(
         version=new_version,
@@ -488,9 +847,9 @@ async def get_prompt_version(prompt_id: str, version: str, db: Session = Depends
     if not db_version:
         raise HTTPException(status_code=404, detail=f"Version '{version}' not found for prompt '{prompt_id}'")
     
-    performance_metrics = json.loads(db_version.performance_metrics) if db_version.performance_metrics else []
-    template_schema = json.loads(db_version.template_schema) if db_version.template_schema else None
-    parameters = json.loads(db_version.parameters) if db_version.parameters else None
+    performance_metrics = [metric_model_to_pydantic(m) for m in db_version.metrics]
+    template_schema = orjson.loads(db_version.template_schema) if db_version.template_schema else None
+    parameters = orjson.loads(db_version.parameters) if db_version.parameters else None
     
     return PromptVersion(
         version=db_version.version,
@@ -521,86 +880,91 @@ async def add_metrics(
     if not db_version:
         raise HTTPException(status_code=404, detail=f"Version '{version}' not found for prompt '{prompt_id}'")
     
-    # Add new metric
-    new_metric = {
-        "metric": metrics.metric,
-        "value": metrics.value,
-        "timestamp": datetime.utcnow().isoformat(),
-        "model": metrics.model,
-        "notes": metrics.notes
-    }
-    
-    performance_metrics = json.loads(db_version.performance_metrics) if db_version.performance_metrics else []
-    performance_metrics.append(new_metric)
-    
-    db_version.performance_metrics = json.dumps(performance_metrics)
+    # Add new metric as its own row
+    db.add(PromptMetricModel(
+        version_id=db_version.id,
+        metric=metrics.metric,
+        value=metrics.value,
+        model=metrics.model,
+        notes=metrics.notes,
+        timestamp=utc_now()
+    ))
     db.commit()
     
-    return performance_metrics
+    return [metric_model_to_pydantic(m) for m in db_version.metrics]
 
 @app.post("/prompts/{prompt_id}/render", response_model=dict)
 async def render_prompt(prompt_id: str, render_params: PromptRender, db: Session = Depends(get_db)):
-    prompt = db.query(PromptModel).filter(PromptModel.id == prompt_id).first()
-    if not prompt:
-        prompt = db.query(PromptModel).filter(PromptModel.name == prompt_id).first()
+    entry = get_cached_prompt(prompt_id)
+    if entry is None:
+        prompt = find_prompt(db, prompt_id)
+        if not prompt:
+            raise HTTPException(status_code=404, detail=f"Prompt with ID or name '{prompt_id}' not found")
         
-    if not prompt:
-        raise HTTPException(status_code=404, detail=f"Prompt with ID or name '{prompt_id}' not found")
+        entry = {
+            "id": prompt.id,
+            "name": prompt.name,
+            "current_version": prompt.current_version,
+            "versions": {}
+        }
+        cache_prompt(prompt_id, entry)
     
     # Get requested version or use current version
-    version = render_params.version or prompt.current_version
-    
-    db_version = db.query(PromptVersionModel).filter(
-        PromptVersionModel.prompt_id == prompt.id,
-        PromptVersionModel.version == version
-    ).first()
+    version = render_params.version or entry["current_version"]
     
-    if not db_version:
-        raise HTTPException(status_code=404, detail=f"Version '{version}' not found for prompt '{prompt_id}'")
+    db_version = entry["versions"].get(version)
+    if db_version is None:
+        db_version = db.query(
+            PromptVersionModel.id, PromptVersionModel.content, PromptVersionModel.template
+        ).filter(
+            PromptVersionModel.prompt_id == entry["id"],
+            PromptVersionModel.version == version
+        ).first()
+        
+        if not db_version:
+            raise HTTPException(status_code=404, detail=f"Version '{version}' not found for prompt '{prompt_id}'")
+        
+        entry["versions"][version] = db_version
     
     # Check if this is a template
     if db_version.template:
         # Render template with provided parameters
-        rendered_content = render_template(db_version.content, render_params.parameters)
+        rendered_content = render_template(db_version.id, db_version.content, render_params.parameters)
         
-        return {
-            "prompt_id": prompt.id,
-            "name": prompt.name,
+        return ORJSONResponse({
+            "prompt_id": entry["id"],
+            "name": entry["name"],
             "version": version,
             "rendered_content": rendered_content,
             "parameters": render_params.parameters
-        }
+        })
     else:
         # Return the content as is
-        return {
-            "prompt_id": prompt.id,
-            "name": prompt.name,
+        return ORJSONResponse({
+            "prompt_id": entry["id"],
+            "name": entry["name"],
             "version": version,
             "rendered_content": db_version.content,
             "parameters": {}
-        }
+        })
 
 @app.get("/categories", response_model=List[str])
 async def list_categories(db: Session = Depends(get_db)):
-    categories = db.query(PromptModel.category).distinct().all()
-    return [c[0] for c in categories if c[0] is not None]
+    # Answered from the category index alone
+    categories = db.query(PromptModel.category).filter(PromptModel.category.isnot(None)).distinct().all()
+    return [c[0] for c in categories]
 
 @app.get("/models", response_model=List[str])
 async def list_models(db: Session = Depends(get_db)):
-    models = db.query(PromptModel.model).distinct().all()
-    return [m[0] for m in models if m[0] is not None]
+    # Answered from the model index alone
+    models = db.query(PromptModel.model).filter(PromptModel.model.isnot(None)).distinct().all()
+    return [m[0] for m in models]
 
 @app.get("/tags", response_model=List[str])
 async def list_tags(db: Session = Depends(get_db)):
-    prompts = db.query(PromptModel).all()
-    tags = set()
-    
-    for prompt in prompts:
-        if prompt.tags:
-            prompt_tags = json.loads(prompt.tags)
-            tags.update(prompt_tags)
-    
-    return sorted(list(tags))
+    # Distinct and sorted by walking the (tag, prompt_id) index
+    tags = db.query(PromptTagModel.tag).distinct().order_by(PromptTagModel.tag).all()
+    return ORJSONResponse([t[0] for t in tags])
 
 @app.post("/import", response_model=List[Prompt])
 async def import_prompts(file_path: str = Body(..., embed=True), db: Session = Depends(get_db)):
@@ -608,40 +972,13 @@ async def import_prompts(file_path: str = Body(..., embed=True), db: Session = D
     if not import_path.exists():
         raise HTTPException(status_code=400, detail=f"File or directory '{file_path}' does not exist")
     
-    imported_prompts = []
+    import_data = []
     
     if import_path.is_file():
         # Import single file
         if import_path.suffix in ['.json', '.yaml', '.yml']:
             try:
-                # Read file content
-                async with aiofiles.open(import_path, "r") as f:
-                    content = await f.read()
-                
-                if import_path.suffix == '.json':
-                    data = json.loads(content)
-                else:
-                    data = yaml.safe_load(content)
-                
-                # Handle both single prompt and list of prompts
-                prompts_data = data if isinstance(data, list) else [data]
-                
-                for prompt_data in prompts_data:
-                    # Create prompt using the API endpoint
-                    create_data = PromptCreate(
-                        name=prompt_data['name'],
-                        description=prompt_data.get('description', ''),
-                        category=prompt_data.get('category', 'General'),
-                        model=prompt_data.get('model', 'Any'),
-                        tags=prompt_data.get('tags', []),
-                        content=prompt_data['content'],
-                        is_template=prompt_data.get('is_template', False),
-                        template_schema=prompt_data.get('template_schema')
-                    )
-                    
-                    prompt = await create_prompt(create_data, db)
-                    imported_prompts.append(prompt)
-            
+                import_data = await asyncio.to_thread(load_import_file, import_path)
             except Exception as e:
                 logger.error(f"Error importing file {import_path}: {str(e)}")
                 raise HTTPException(status_code=400, detail=f"Error importing file: {str(e)}")
@@ -653,46 +990,64 @@ async def import_prompts(file_path: str = Body(..., embed=True), db: Session = D
         for file in import_path.glob("**/*"):
             if file.is_file() and file.suffix in ['.json', '.yaml', '.yml']:
                 try:
-                    # Read file content
-                    async with aiofiles.open(file, "r") as f:
-                        content = await f.read()
-                    
-                    if file.suffix == '.json':
-                        data = json.loads(content)
-                    else:
-                        data = yaml.safe_load(content)
-                    
-                    # Handle both single prompt and list of prompts
-                    prompts_data = data if isinstance(data, list) else [data]
-                    
-                    for prompt_data in prompts_data:
-                        # Create prompt using the API endpoint
-                        create_data = PromptCreate(
-                            name=prompt_data['name'],
-                            description=prompt_data.get('description', ''),
-                            category=prompt_data.get('category', 'General'),
-                            model=prompt_data.get('model', 'Any'),
-                            tags=prompt_data.get('tags', []),
-                            content=prompt_data['content'],
-                            is_template=prompt_data.get('is_template', False),
-                            template_schema=prompt_data.get('template_schema')
-                        )
-                        
-                        try:
-                            prompt = await create_prompt(create_data, db)
-                            imported_prompts.append(prompt)
-                        except HTTPException as he:
-                            # Skip prompts that already exist
-                            if he.status_code == 400 and "already exists" in he.detail:
-                                logger.warning(f"Skipping import of '{prompt_data['name']}': {he.detail}")
-                            else:
-                                raise
-                
+                    import_data.extend(await asyncio.to_thread(load_import_file, file))
                 except Exception as e:
                     logger.error(f"Error importing file {file}: {str(e)}")
                     # Continue with other files
     
-    return imported_prompts
+    # Look up every name that already exists in one query
+    names = [prompt.name for prompt in import_data]
+    taken_names = {row[0] for row in db.query(PromptModel.name).filter(PromptModel.name.in_(names))} if names else set()
+    
+    now = utc_now()
+    prompt_rows = []
+    version_rows = []
+    prompt_tags = []
+    prompt_files = []
+    
+    for prompt in import_data:
+        if prompt.name in taken_names:
+            detail = f"Prompt with name '{prompt.name}' already exists"
+            if import_path.is_file():
+                logger.error(f"Error importing file {import_path}: {detail}")
+                raise HTTPException(status_code=400, detail=f"Error importing file: {detail}")
+            
+            # Skip prompts that already exist
+            logger.warning(f"Skipping import of '{prompt.name}': {detail}")
+            continue
+        
+        taken_names.add(prompt.name)
+        prompt_row, version_row, metadata = new_prompt_rows(prompt, now)
+        prompt_rows.append(prompt_row)
+        version_rows.append(version_row)
+        prompt_tags.append((prompt_row["id"], prompt.tags))
+        prompt_files.append((prompt_row["id"], version_row["version"], prompt.content, metadata))
+    
+    # Insert all prompts and versions in a single transaction
+    db.bulk_insert_mappings(PromptModel, prompt_rows)
+    db.bulk_insert_mappings(PromptVersionModel, version_rows)
+    add_prompt_tags(db, prompt_tags)
+    
+    # Point each prompt at its first version once the version rows exist
+    db.bulk_update_mappings(PromptModel, [
+        {"id": version_row["prompt_id"], "current_version_id": version_row["id"]}
+        for version_row in version_rows
+    ])
+    db.commit()
+    
+    # Save prompt files concurrently, bounded to avoid exhausting the worker threads
+    write_slots = asyncio.Semaphore(IMPORT_WRITE_CONCURRENCY)
+    
+    async def write_files(*args):
+        async with write_slots:
+            await write_prompt_files(*args)
+    
+    await asyncio.gather(*[write_files(*files) for files in prompt_files])
+    
+    return [
+        prompt_model_to_pydantic(PromptModel(**prompt_row, versions=[PromptVersionModel(**version_row)]))
+        for prompt_row, version_row in zip(prompt_rows, version_rows)
+    ]
 
 @app.post("/export", response_model=dict)
 async def export_prompts(
@@ -703,8 +1058,10 @@ async def export_prompts(
     format: str = "json",
     db: Session = Depends(get_db)
 ):
-    # Get prompts based on filters
-    query = db.query(PromptModel)
+    # Get prompts based on filters, each joined with its current version
+    query = db.query(PromptModel, PromptVersionModel).outerjoin(
+        PromptVersionModel, PromptVersionModel.id == PromptModel.current_version_id
+    )
     
     if category:
         query = query.filter(PromptModel.category == category)
@@ -714,21 +1071,13 @@ async def export_prompts(
     
     if tag:
         # Filter prompts that have the specified tag
-        query = query.filter(PromptModel.tags.like(f'%"{tag}"%'))
-    
-    prompts = query.all()
-    
-    if not prompts:
-        raise HTTPException(status_code=404, detail="No prompts found matching the criteria")
+        query = query.join(PromptTagModel, PromptTagModel.prompt_id == PromptModel.id).filter(PromptTagModel.tag == tag)
     
     # Convert to export format
     export_data = []
-    for prompt in prompts:
-        # Get current version
-        current_version = db.query(PromptVersionModel).filter(
-            PromptVersionModel.prompt_id == prompt.id,
-            PromptVersionModel.version == prompt.current_version
-        ).first()
+    prompts_found = False
+    for prompt, current_version in query.yield_per(500):
+        prompts_found = True
         
         if current_version:
             export_item = {
@@ -736,24 +1085,25 @@ async def export_prompts(
                 "description": prompt.description,
                 "category": prompt.category,
                 "model": prompt.model,
-                "tags": json.loads(prompt.tags) if prompt.tags else [],
+                "tags": orjson.loads(prompt.tags) if prompt.tags else [],
                 "content": current_version.content,
                 "is_template": current_version.template,
-                "template_schema": json.loads(current_version.template_schema) if current_version.template_schema else None
+                "template_schema": orjson.loads(current_version.template_schema) if current_version.template_schema else None
             }
             export_data.append(export_item)
     
+    if not prompts_found:
+        raise HTTPException(status_code=404, detail="No prompts found matching the criteria")
+    
     # Ensure export directory exists
     export_dir = Path(export_path).parent
     export_dir.mkdir(exist_ok=True, parents=True)
     
     # Write export file
     if format.lower() == "json":
-        async with aiofiles.open(export_path, "w") as f:
-            await f.write(json.dumps(export_data, indent=2))
+        await write_bytes(export_path, orjson.dumps(export_data, option=orjson.OPT_INDENT_2))
     elif format.lower() in ["yaml", "yml"]:
-        async with aiofiles.open(export_path, "w") as f:
-            await f.write(yaml.dump(export_data, sort_keys=False))
+        await write_bytes(export_path, yaml.dump(export_data, Dumper=YamlDumper, sort_keys=False).encode())
     else:
         raise HTTPException(status_code=400, detail="Unsupported format. Only JSON and YAML are supported.")
     